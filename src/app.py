@@ -1,11 +1,21 @@
-from flask import Flask
+from flask import Flask, request, jsonify
+import redis
 
-from config import FLASK_SECRET_KEY, UPLOAD_ROOT, FIREBASE_WEB_API_KEY, SENSOR_API_KEY
-from extensions import limiter
+from config import (
+    FLASK_SECRET_KEY, UPLOAD_ROOT, FIREBASE_WEB_API_KEY, SENSOR_API_KEY, SESSION_REDIS_URL,
+    COMPRESS_ALGORITHM, COMPRESS_LEVEL, COMPRESS_BR_LEVEL, COMPRESS_MIN_SIZE,
+    MAX_UPLOAD_BYTES,
+)
+from extensions import limiter, server_session, compress
+from utils.json_provider import ORJSONProvider
+from utils.log_queue import route_flask_logger
+from utils.validation import is_valid_device_id
 
 print("--- SmartPost Startup Check ---")
 print(f"  FLASK_SECRET_KEY set?       {bool(FLASK_SECRET_KEY)}")
 print(f"  FIREBASE_WEB_API_KEY set?   {bool(FIREBASE_WEB_API_KEY)}")
+# Firestore is initialised on first use; a missing key file is reported there (see firebase.py)
+print(f"  Server-side sessions?       {bool(SESSION_REDIS_URL)}")
 #print(f"  SENSOR_API_KEY set?         {bool(SENSOR_API_KEY)}")
 print(f"  Note for developers: if confused about Redis (a recent addition), ask Mik.")
 print("-------------------------------")
@@ -22,9 +32,38 @@ from blueprints.notifications.routes import notifications_bp
 app = Flask(__name__)
 app.secret_key = FLASK_SECRET_KEY
 
+# Flask's own logger (unhandled exceptions etc.) writes to stderr via the
+# background listener instead of blocking the request thread.
+route_flask_logger(app)
+
+# Reject oversized bodies (e.g. camera uploads) with 413 before they are spooled
+app.config["MAX_CONTENT_LENGTH"] = MAX_UPLOAD_BYTES
+
+# Faster jsonify()/get_json() via orjson
+app.json = ORJSONProvider(app)
+
 # Rate limiter (shared instance from extensions.py)
 limiter.init_app(app)
 
+# Compress JSON/HTML responses (notification lists, state polling, pages)
+app.config.update(
+    COMPRESS_ALGORITHM=COMPRESS_ALGORITHM,
+    COMPRESS_LEVEL=COMPRESS_LEVEL,
+    COMPRESS_BR_LEVEL=COMPRESS_BR_LEVEL,
+    COMPRESS_MIN_SIZE=COMPRESS_MIN_SIZE,
+)
+compress.init_app(app)
+
+# Keep the session dict (including the Firebase ID token) in Redis so the
+# cookie is a small opaque id instead of the full signed payload.
+if SESSION_REDIS_URL:
+    app.config.update(
+        SESSION_TYPE="redis",
+        SESSION_REDIS=redis.Redis.from_url(SESSION_REDIS_URL),
+        SESSION_PERMANENT=False,
+    )
+    server_session.init_app(app)
+
 # Ensure uploads directory exists
 UPLOAD_ROOT.mkdir(parents=True, exist_ok=True)
 
@@ -37,13 +76,25 @@ app.register_blueprint(profile_bp)
 app.register_blueprint(notifications_bp)
 
 
+@app.before_request
+def reject_invalid_device_id():
+    """Validate the <device_id> URL segment once for every device route
+    instead of repeating the check in each view."""
+    device_id = (request.view_args or {}).get("device_id")
+    if device_id is not None and not is_valid_device_id(device_id):
+        return jsonify({"error": "Invalid device_id."}), 400
+
+
 @app.after_request
 def no_cache_authenticated_pages(response):
     """Prevent browser from caching pages so back-button after logout
-    forces a fresh server request instead of showing stale content."""
-    response.headers["Cache-Control"] = "no-cache, no-store, must-revalidate"
-    response.headers["Pragma"] = "no-cache"
-    response.headers["Expires"] = "0"
+    forces a fresh server request instead of showing stale content.
+    Responses that set their own Cache-Control (state polling, files,
+    ETag-revalidated JSON) keep it."""
+    if "Cache-Control" not in response.headers:
+        response.headers["Cache-Control"] = "no-cache, no-store, must-revalidate"
+        response.headers["Pragma"] = "no-cache"
+        response.headers["Expires"] = "0"
     return response
 
 
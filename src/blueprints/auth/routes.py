@@ -5,7 +5,8 @@ import re
 
 from config import FIREBASE_WEB_API_KEY
 from extensions import limiter
-from firebase import db
+from firebase import get_app
+from utils.templates import render_static_page
 
 auth_bp = Blueprint("auth", __name__)
 
@@ -52,6 +53,8 @@ def _extract_id_token_from_request(data: dict) -> str:
 
 
 def _start_user_session_from_id_token(id_token: str) -> dict:
+    # Firebase is initialised lazily; make sure the default app exists
+    get_app()
     decoded = firebase_auth.verify_id_token(id_token)
 
     uid = decoded.get("uid") or decoded.get("user_id") or decoded.get("sub")
@@ -94,7 +97,7 @@ def _validate_signup_input(email: str, password: str, confirm_password: str) ->
 @limiter.limit("10 per minute")
 def login():
     if request.method == "GET":
-        return render_template("login.html", error=None)
+        return render_static_page("login.html", error=None)
 
     # JSON callers get the API path
     if request.is_json:
@@ -134,7 +137,7 @@ def login():
 @limiter.limit("10 per minute")
 def signup():
     if request.method == "GET":
-        return render_template("signup.html", error=None)
+        return render_static_page("signup.html", error=None)
 
     if request.is_json:
         return api_signup()
@@ -2,6 +2,7 @@ from flask import Blueprint, render_template, redirect, url_for, session
 
 from utils.auth import get_current_user
 from utils.device_access import get_user_devices
+from utils.templates import render_static_page
 from decorators.auth import login_required
 
 dashboard_bp = Blueprint("dashboard", __name__)
@@ -12,7 +13,7 @@ def home():
     username = get_current_user()
 
     if not username:
-        return render_template(
+        return render_static_page(
             "landing.html",
             project_name="Smart Post"
         )
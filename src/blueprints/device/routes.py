@@ -1,25 +1,60 @@
 from collections import deque
-from datetime import datetime, timezone
 from threading import Lock
 
 from flask import Blueprint, render_template, request, redirect, url_for, jsonify, current_app
 
 from utils.auth import require_device_api_key
-from utils.notifications import publish_device_notification
+from utils.firestore import _utc_now_iso
+from utils.log_queue import get_queue_logger
+from utils.validation import is_valid_device_id
+from utils.notifications import enqueue_device_notification
 from utils.device_access import user_can_access_device, claim_device
 from decorators.auth import login_required, api_login_required
 
 from extensions import limiter
 
 device_bp = Blueprint("device", __name__)
+log = get_queue_logger("smartpost.device")
 
-DEVICE_STATE = {}
+# Latest device state, stored as the encoded /state response.  State only
+# changes when telemetry arrives, so the JSON is built once per telemetry post
+# instead of once per browser poll.
+DEVICE_STATE_JSON = {}
 DEVICE_COMMANDS = {}
 DEVICE_LOCK = Lock()
 
+ALLOWED_COMMANDS = ("open", "close", "capture")
+_VALID_COMMANDS = frozenset(ALLOWED_COMMANDS)
 
-def utc_now_iso():
-    return datetime.now(timezone.utc).isoformat()
+
+def _default_state(device_id):
+    return {
+        "device_id": device_id,
+        "door_state": "unknown",
+        "weight_g": 0.0,
+        "servo_state": "unknown",
+        "solenoid_state": "unknown",
+        "actuator_state": "unknown",
+        "last_update_iso": None,
+    }
+
+
+def _encode_state_response(device_id, state):
+    """Build the /state response body for `state` as UTF-8 JSON bytes."""
+    return current_app.json.dumps({
+        "device_id": device_id,
+        "door_state": state.get("door_state", "unknown"),
+        "weight_g": state.get("weight_g", 0.0),
+        "servo_state": state.get("servo_state", "unknown"),
+        "solenoid_state": state.get("solenoid_state", "unknown"),
+        "actuator_state": state.get("actuator_state", "unknown"),
+        "last_update_iso": state.get("last_update_iso"),
+        "cameras": {
+            "cam0": f"/media/device/{device_id}/camera/0/latest.jpg",
+            "cam1": f"/media/device/{device_id}/camera/1/latest.jpg",
+            "cam2": f"/media/device/{device_id}/camera/2/latest.jpg",
+        }
+    }).encode()
 
 
 @device_bp.route("/pair-device", methods=["GET"])
@@ -38,6 +73,9 @@ def pair_device_submit(username):
     if not device_id or not claim_code:
         return render_template("pair_device.html", error="Device ID and claim code are required.")
 
+    if not is_valid_device_id(device_id):
+        return render_template("pair_device.html", error="Invalid device ID.")
+
     ok, message = claim_device(username, device_id, claim_code)
     if not ok:
         return render_template("pair_device.html", error=message)
@@ -61,30 +99,21 @@ def api_device_state(username, device_id):
         return jsonify({"error": "Forbidden"}), 403
 
     with DEVICE_LOCK:
-        state = DEVICE_STATE.get(device_id, {
-            "device_id": device_id,
-            "door_state": "unknown",
-            "weight_g": 0.0,
-            "servo_state": "unknown",
-            "solenoid_state": "unknown",
-            "actuator_state": "unknown",
-            "last_update_iso": None,
-        })
+        body = DEVICE_STATE_JSON.get(device_id)
 
-    return jsonify({
-        "device_id": device_id,
-        "door_state": state.get("door_state", "unknown"),
-        "weight_g": state.get("weight_g", 0.0),
-        "servo_state": state.get("servo_state", "unknown"),
-        "solenoid_state": state.get("solenoid_state", "unknown"),
-        "actuator_state": state.get("actuator_state", "unknown"),
-        "last_update_iso": state.get("last_update_iso"),
-        "cameras": {
-            "cam0": f"/media/device/{device_id}/camera/0/latest.jpg",
-            "cam1": f"/media/device/{device_id}/camera/1/latest.jpg",
-            "cam2": f"/media/device/{device_id}/camera/2/latest.jpg",
-        }
-    }), 200
+    if body is None:
+        # No telemetry yet: encode the placeholder once and keep it until the
+        # device reports in.  setdefault keeps a body telemetry may have just
+        # stored in the meantime.
+        body = _encode_state_response(device_id, _default_state(device_id))
+        with DEVICE_LOCK:
+            body = DEVICE_STATE_JSON.setdefault(device_id, body)
+
+    response = current_app.response_class(body, mimetype="application/json")
+    # Lets the browser reuse a state fetched in the same second (e.g. the
+    # fetch right after a command) without another round-trip.
+    response.headers["Cache-Control"] = "private, max-age=1"
+    return response, 200
 
 
 @device_bp.route("/api/device/<device_id>/telemetry", methods=["POST"])
@@ -108,18 +137,21 @@ def api_device_telemetry(device_id):
     solenoid_state = data.get("solenoid_state", "unknown")
     actuator_state = data.get("actuator_state", "unknown")
 
+    state = {
+        "device_id": device_id,
+        "door_state": door_state,
+        "weight_g": weight_g,
+        "servo_state": servo_state,
+        "solenoid_state": solenoid_state,
+        "actuator_state": actuator_state,
+        "last_update_iso": _utc_now_iso(),
+    }
+    body = _encode_state_response(device_id, state)
+
     with DEVICE_LOCK:
-        DEVICE_STATE[device_id] = {
-            "device_id": device_id,
-            "door_state": door_state,
-            "weight_g": weight_g,
-            "servo_state": servo_state,
-            "solenoid_state": solenoid_state,
-            "actuator_state": actuator_state,
-            "last_update_iso": utc_now_iso(),
-        }
+        DEVICE_STATE_JSON[device_id] = body
 
-    print(f"Telemetry received from {device_id}: {data}", flush=True)
+    log.info("TELEMETRY device=%s data=%s", device_id, data)
     return jsonify({"message": "Telemetry received."}), 200
 
 
@@ -132,16 +164,16 @@ def api_device_command(username, device_id):
     if not request.is_json:
         return jsonify({"error": "Content-Type must be application/json."}), 415
 
+    # get_json() decodes through the orjson provider set as app.json
     data = request.get_json(silent=True) or {}
     cmd = data.get("command")
 
-    ALLOWED_COMMANDS = ("open", "close", "capture")
-    if cmd not in ALLOWED_COMMANDS:
+    if not isinstance(cmd, str) or cmd not in _VALID_COMMANDS:
         return jsonify({"error": f"command must be one of {ALLOWED_COMMANDS}."}), 400
 
     queued_item = {
         "command": cmd,
-        "created_at": utc_now_iso(),
+        "created_at": _utc_now_iso(),
         "created_by": username,
     }
 
@@ -161,38 +193,35 @@ def api_device_command(username, device_id):
             DEVICE_COMMANDS[device_id] = deque()
         DEVICE_COMMANDS[device_id].append(queued_item)
 
-    print(f"COMMAND QUEUED user={username} device={device_id} command={cmd}", flush=True)
-
-    notif_result = None
-    try:
-        notif_result = publish_device_notification(
+    log.info("COMMAND QUEUED user=%s device=%s command=%s", username, device_id, cmd)
+
+    # Notifications are written by the background worker so the response does
+    # not wait on Firestore.
+    notif_result = enqueue_device_notification(
+        actor_username=username,
+        device_id=device_id,
+        notif_type="device_command",
+        title=f"Command sent: {cmd}",
+        body=f"{username} sent '{cmd}' to device {device_id}.",
+        severity="info",
+        data={"command": cmd, "source": "api_device_command"},
+    )
+
+    if cmd == "close":
+        enqueue_device_notification(
             actor_username=username,
             device_id=device_id,
-            notif_type="device_command",
-            title=f"Command sent: {cmd}",
-            body=f"{username} sent '{cmd}' to device {device_id}.",
+            notif_type="door_close_requested",
+            title="Door close requested",
+            body=f"{username} requested door close on device {device_id}.",
             severity="info",
-            data={"command": cmd, "source": "api_device_command"},
+            data={
+                "command": "close",
+                "source": "ui",
+                "event": "door_close_requested",
+            },
         )
 
-        if cmd == "close":
-            publish_device_notification(
-                actor_username=username,
-                device_id=device_id,
-                notif_type="door_close_requested",
-                title="Door close requested",
-                body=f"{username} requested door close on device {device_id}.",
-                severity="info",
-                data={
-                    "command": "close",
-                    "source": "ui",
-                    "event": "door_close_requested",
-                },
-            )
-
-    except Exception as e:
-        current_app.logger.exception("Notification publish failed: %s", e)
-
     return jsonify({
         "message": f"Command '{cmd}' queued for {device_id}.",
         "notification": notif_result,
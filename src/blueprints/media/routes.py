@@ -1,14 +1,41 @@
+import os
+import shutil
+import threading
 from pathlib import Path
 
-from flask import Blueprint, request, jsonify, send_file
+from flask import Blueprint, request, jsonify, send_from_directory
+from werkzeug.exceptions import NotFound
 from werkzeug.utils import secure_filename
 
-from config import BASE_DIR, UPLOAD_ROOT, ALLOWED_IMAGE_EXTS
+from config import BASE_DIR, UPLOAD_ROOT, ALLOWED_IMAGE_EXTS, UPLOAD_CHUNK_BYTES
 from utils.auth import require_device_api_key
 from utils.device_access import user_can_access_device
+from utils.log_queue import get_queue_logger
 from decorators.auth import login_required
 
 media_bp = Blueprint("media", __name__)
+log = get_queue_logger("smartpost.media")
+
+
+def _save_upload_atomically(f, dest: Path) -> None:
+    """Write an uploaded file to `dest` without ever exposing a partial file.
+
+    The upload is written to a per-writer temp file in the same directory,
+    fsynced, then renamed over `dest`.  Browsers polling latest.jpg see either
+    the old snapshot or the new one, and a crash mid-upload leaves the previous
+    snapshot intact instead of a truncated JPEG.
+    """
+    tmp = dest.with_name(f".{dest.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        with open(tmp, "wb") as out:
+            # Stream in large chunks; memory stays bounded by the chunk size.
+            shutil.copyfileobj(f.stream, out, UPLOAD_CHUNK_BYTES)
+            out.flush()
+            os.fsync(out.fileno())
+        os.replace(tmp, dest)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
 
 
 @media_bp.route("/api/device/<device_id>/camera/<int:camera_id>/snapshot", methods=["POST"])
@@ -39,11 +66,11 @@ def api_device_camera_snapshot(device_id, camera_id):
     device_dir.mkdir(parents=True, exist_ok=True)
 
     stored_path = device_dir / f"cam{camera_id}.jpg"
-    f.save(stored_path)
+    _save_upload_atomically(f, stored_path)
 
     size_bytes = stored_path.stat().st_size
 
-    print(f"Snapshot received: device={device_id}, camera={camera_id}", flush=True)
+    log.info("SNAPSHOT device=%s camera=%s bytes=%s", device_id, camera_id, size_bytes)
 
     return jsonify({
         "message": "Latest snapshot updated.",
@@ -63,9 +90,16 @@ def media_device_camera_latest(username, device_id, camera_id):
     if camera_id not in (0, 1, 2):
         return jsonify({"error": "camera_id must be 0, 1, or 2."}), 400
 
-    image_path = UPLOAD_ROOT / f"device_{device_id}" / "latest" / f"cam{camera_id}.jpg"
+    latest_dir = UPLOAD_ROOT / f"device_{device_id}" / "latest"
+    filename = f"cam{camera_id}.jpg"
 
-    if not image_path.exists():
+    # ETag/Last-Modified let the browser revalidate and get a 304 when the
+    # snapshot has not changed; the body goes out via wsgi.file_wrapper.
+    # send_from_directory already checks the file exists, so no separate stat.
+    try:
+        response = send_from_directory(latest_dir, filename, mimetype="image/jpeg", conditional=True)
+    except NotFound:
         return jsonify({"error": "Snapshot not found."}), 404
-
-    return send_file(image_path, mimetype="image/jpeg")
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
@@ -1,10 +1,10 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app
+from google.api_core.exceptions import FailedPrecondition
 from firebase_admin import firestore
-from collections import OrderedDict
 from datetime import datetime, timedelta, timezone
 
 from firebase import db
-from utils.firestore import _serialize_doc
+from utils.firestore import _serialize_doc, BatchWriter, user_inbox_ref
 from utils.notifications import publish_device_notification
 from decorators.auth import api_login_required
 from utils.device_access import user_can_access_device
@@ -17,6 +17,8 @@ from utils.notification_cache import (
 
 notifications_bp = Blueprint("notifications", __name__)
 
+_DOOR_CLOSE_EVENT_TYPES = ("door_closed", "door_close_requested")
+
 
 @notifications_bp.route("/api/notifications", methods=["GET"])
 @api_login_required
@@ -43,9 +45,7 @@ def api_notifications_list(username):
     # Cache miss: fetch the maximum allowed number of items from Firestore so
     # the cached list covers all realistic pagination/filter needs.
     q = (
-        db.collection("users")
-        .document(username)
-        .collection("notifications")
+        user_inbox_ref(db, username)
         .order_by("created_at", direction=firestore.Query.DESCENDING)
         .limit(100)
     )
@@ -73,12 +73,7 @@ def api_notifications_unread_count(username):
     if cached is not None:
         return jsonify({"username": username, "unread_count": cached}), 200
 
-    q = (
-        db.collection("users")
-        .document(username)
-        .collection("notifications")
-        .where("read", "==", False)
-    )
+    q = user_inbox_ref(db, username).where("read", "==", False)
 
     # Use server-side count aggregation to avoid streaming every document.
     result = q.count().get()
@@ -95,12 +90,7 @@ def api_notifications_unread_count(username):
 @notifications_bp.route("/api/notifications/<notification_id>/read", methods=["POST"])
 @api_login_required
 def api_notifications_mark_read(username, notification_id):
-    doc_ref = (
-        db.collection("users")
-        .document(username)
-        .collection("notifications")
-        .document(notification_id)
-    )
+    doc_ref = user_inbox_ref(db, username).document(notification_id)
     doc = doc_ref.get()
     if not doc.exists:
         return jsonify({"error": "Notification not found"}), 404
@@ -122,29 +112,28 @@ def api_notifications_mark_read(username, notification_id):
 @notifications_bp.route("/api/notifications/read-all", methods=["POST"])
 @api_login_required
 def api_notifications_mark_all_read(username):
+    # Only the document references are needed, so project to no fields and
+    # skip downloading each notification's payload.
     q = (
-        db.collection("users")
-        .document(username)
-        .collection("notifications")
+        user_inbox_ref(db, username)
         .where("read", "==", False)
+        .select([])
     )
 
-    docs = list(q.stream())
-    batch = db.batch()
-    for doc in docs:
-        batch.update(doc.reference, {
+    writer = BatchWriter(db)
+    for doc in q.stream():
+        writer.update(doc.reference, {
             "read": True,
             "read_at": firestore.SERVER_TIMESTAMP,
             "updated_at": firestore.SERVER_TIMESTAMP,
         })
-    if docs:
-        batch.commit()
+    updated_count = writer.commit()
 
     invalidate_notification_cache(username)
 
     return jsonify({
         "message": "Marked all as read",
-        "updated_count": len(docs),
+        "updated_count": updated_count,
     }), 200
 
 
@@ -157,35 +146,23 @@ def api_notifications_clear(username):
     if mode not in ("all", "read"):
         return jsonify({"error": "mode must be 'all' or 'read'"}), 400
 
-    q = (
-        db.collection("users")
-        .document(username)
-        .collection("notifications")
-    )
+    q = user_inbox_ref(db, username)
 
     if mode == "read":
         q = q.where("read", "==", True)
 
-    docs = list(q.stream())
+    writer = BatchWriter(db)
+    for doc in q.stream():
+        writer.delete(doc.reference)
+    total_deleted = writer.commit()
 
-    if not docs:
+    if not total_deleted:
         return jsonify({
             "message": "Nothing to clear",
             "cleared_count": 0,
             "mode": mode
         }), 200
 
-    total_deleted = 0
-    BATCH_SIZE = 450
-
-    for i in range(0, len(docs), BATCH_SIZE):
-        batch = db.batch()
-        chunk = docs[i:i + BATCH_SIZE]
-        for doc in chunk:
-            batch.delete(doc.reference)
-        batch.commit()
-        total_deleted += len(chunk)
-
     invalidate_notification_cache(username)
 
     return jsonify({
@@ -287,25 +264,39 @@ def api_device_door_close_chart(username, device_id):
     now = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0)
     start = now - timedelta(hours=hours - 1)
 
-    buckets = OrderedDict()
+    labels = []
     current = start
     while current <= now:
-        label = current.strftime("%m-%d %H:00")
-        buckets[label] = 0
+        labels.append(current.strftime("%m-%d %H:00"))
         current += timedelta(hours=1)
+    values = [0] * len(labels)
+    one_hour = timedelta(hours=1)
 
-    q = (
-        db.collection("notification_events")
-        .where("device_id", "==", device_id)
-        .where("logged_at", ">=", start)
-    )
-    docs = list(q.stream())
+    device_events = db.collection("notification_events").where("device_id", "==", device_id)
+
+    # Filter on type server-side so unrelated events (device_command etc.) are
+    # never sent over the wire. Needs the composite index on
+    # (device_id, type, logged_at) from firestore.indexes.json; until that is
+    # deployed Firestore rejects the query, so fall back to the device/time
+    # query and let the type check below drop the other events.
+    try:
+        docs = list(
+            device_events
+            .where("type", "in", list(_DOOR_CLOSE_EVENT_TYPES))
+            .where("logged_at", ">=", start)
+            .stream()
+        )
+    except FailedPrecondition:
+        current_app.logger.warning(
+            "notification_events (device_id, type, logged_at) index missing; "
+            "door-close chart is using the unfiltered query"
+        )
+        docs = list(device_events.where("logged_at", ">=", start).stream())
 
     for doc in docs:
         item = doc.to_dict() or {}
-        event_type = item.get("type")
 
-        if event_type not in ("door_closed", "door_close_requested"):
+        if item.get("type") not in _DOOR_CLOSE_EVENT_TYPES:
             continue
 
         dt = item.get("logged_at")
@@ -315,25 +306,24 @@ def api_device_door_close_chart(username, device_id):
         if dt is None:
             continue
 
+        # Firestore already returns UTC-aware datetimes; only convert when
+        # the value is naive or in another zone.
         if dt.tzinfo is None:
             dt = dt.replace(tzinfo=timezone.utc)
-        else:
+        elif dt.tzinfo is not timezone.utc:
             dt = dt.astimezone(timezone.utc)
 
-        if dt < start or dt > now + timedelta(hours=1):
-            continue
-
-        bucket_dt = dt.replace(minute=0, second=0, microsecond=0)
-        label = bucket_dt.strftime("%m-%d %H:00")
-
-        if label in buckets:
-            buckets[label] += 1
+        # Bucket by whole hours since `start` instead of formatting a label
+        # per event.
+        index = (dt - start) // one_hour
+        if 0 <= index < len(values):
+            values[index] += 1
 
     result = {
         "device_id": device_id,
-        "labels": list(buckets.keys()),
-        "values": list(buckets.values()),
-        "total": sum(buckets.values()),
+        "labels": labels,
+        "values": values,
+        "total": sum(values),
     }
     set_chart_cache(device_id, hours, result)
     return jsonify(result), 200
\ No newline at end of file
@@ -1,6 +1,10 @@
 from flask import Blueprint, request, jsonify
+from google.api_core.exceptions import NotFound
 
 from firebase import db
+from utils.profile import (
+    get_cached_profile, set_profile_cache, invalidate_profile_cache, profile_cache_generation,
+)
 
 profile_bp = Blueprint("profile", __name__)
 
@@ -14,16 +18,30 @@ def create_profile():
 
     # Save the whole JSON as the document
     db.collection("profiles").document(username).set(data)
+    invalidate_profile_cache(username)
     return jsonify({"message": "Created", "username": username}), 201
 
 
 @profile_bp.route("/api/profile/<username>", methods=["GET"])
 def get_profile(username):
-    doc = db.collection("profiles").document(username).get()
-    if not doc.exists:
-        return jsonify({"error": "Not found"}), 404
-
-    return jsonify({"username": doc.id, **doc.to_dict()}), 200
+    body = get_cached_profile(username)
+    if body is None:
+        # Taken before the read so an update that lands during it keeps this
+        # (possibly stale) snapshot out of the cache.
+        generation = profile_cache_generation(username)
+        doc = db.collection("profiles").document(username).get()
+        if not doc.exists:
+            return jsonify({"error": "Not found"}), 404
+
+        body = {"username": doc.id, **doc.to_dict()}
+        set_profile_cache(username, body, generation)
+
+    # ETag lets a polling client revalidate with If-None-Match and get an
+    # empty 304 instead of the full body when nothing changed.
+    response = jsonify(body)
+    response.add_etag()
+    response.headers["Cache-Control"] = "private, no-cache"
+    return response.make_conditional(request)
 
 
 @profile_bp.route("/api/profile/<username>", methods=["PUT"])
@@ -33,26 +51,33 @@ def update_profile(username):
 
     data = request.get_json(silent=True) or {}
 
-    #  update only the provided fields (partial update)
-    doc_ref = db.collection("profiles").document(username)
-    doc = doc_ref.get()
-    if not doc.exists:
-        return jsonify({"error": "Not found"}), 404
-
     # Firestore update fails if data is empty
     if not data:
         return jsonify({"error": "No fields to update"}), 400
 
-    doc_ref.update(data)
+    # update only the provided fields (partial update). update() already
+    # raises NotFound for a missing document, so no separate get() round-trip.
+    doc_ref = db.collection("profiles").document(username)
+    try:
+        doc_ref.update(data)
+    except NotFound:
+        return jsonify({"error": "Not found"}), 404
+    finally:
+        invalidate_profile_cache(username)
+
     return jsonify({"message": "Updated", "username": username}), 200
 
 
 @profile_bp.route("/api/profile/<username>", methods=["DELETE"])
 def delete_profile(username):
+    # The exists precondition makes delete() raise NotFound for a missing
+    # document, keeping the 404 without a separate get() round-trip.
     doc_ref = db.collection("profiles").document(username)
-    doc = doc_ref.get()
-    if not doc.exists:
+    try:
+        doc_ref.delete(option=db.write_option(exists=True))
+    except NotFound:
         return jsonify({"error": "Not found"}), 404
+    finally:
+        invalidate_profile_cache(username)
 
-    doc_ref.delete()
     return jsonify({"message": "Deleted", "username": username}), 200
@@ -14,6 +14,18 @@ RATELIMIT_STORAGE_URL = os.getenv("RATELIMIT_STORAGE_URL", "redis://localhost:63
 # Flask
 FLASK_SECRET_KEY = os.getenv("FLASK_SECRET_KEY", "dev-secret-key")
 
+# Server-side sessions (Flask-Session). When set, the session dict lives in
+# Redis and the cookie only carries an opaque session id. Leave empty to keep
+# Flask's default signed-cookie sessions (local dev / tests without Redis).
+SESSION_REDIS_URL = os.getenv("SESSION_REDIS_URL", "")
+
+# Response compression (Flask-Compress). Brotli for browsers that accept it,
+# gzip otherwise; bodies under COMPRESS_MIN_SIZE bytes are sent as-is.
+COMPRESS_ALGORITHM = ["br", "gzip"]
+COMPRESS_LEVEL = 4
+COMPRESS_BR_LEVEL = 4
+COMPRESS_MIN_SIZE = 500
+
 # Firestore
 FIREBASE_KEY_PATH = os.getenv("FIREBASE_KEY_PATH", str(BASE_DIR / "serviceAccountKey.json"))
 
@@ -27,6 +39,8 @@ SENSOR_API_KEY = os.getenv("SENSOR_API_KEY", "")
 UPLOAD_ROOT = BASE_DIR / "src" / "uploads"
 ALLOWED_IMAGE_EXTS = {".jpg", ".jpeg", ".png", ".gif", ".webp"}
 MEDIA_TTL_SECONDS = 180  # 3 minutes
+MAX_UPLOAD_BYTES = 10 * 1024 * 1024  # request body cap (Flask MAX_CONTENT_LENGTH)
+UPLOAD_CHUNK_BYTES = 1024 * 1024  # copy size when writing uploads to disk
 
 # Notifications
 NOTIFICATION_SCHEMA_VERSION = 1
@@ -1,6 +1,8 @@
 # Redis-backed Limiter instance. Initialized with app in app.py
+from flask_compress import Compress
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
+from flask_session import Session
 from config import RATELIMIT_STORAGE_URL
 
 limiter = Limiter(
@@ -8,3 +10,9 @@ limiter = Limiter(
 	default_limits=["60 per minute"],
 	storage_uri=RATELIMIT_STORAGE_URL
 )
+
+# Server-side session store. Only initialized in app.py when SESSION_REDIS_URL is set
+server_session = Session()
+
+# Brotli/gzip response compression. Configured and initialized in app.py
+compress = Compress()
@@ -1,16 +1,67 @@
+import inspect
 from pathlib import Path
+from threading import Lock
+
 import firebase_admin
 from firebase_admin import credentials, firestore
 
 from config import FIREBASE_KEY_PATH
 
-if not Path(FIREBASE_KEY_PATH).exists():
-    raise FileNotFoundError(f"Firestore key not found at: {FIREBASE_KEY_PATH}")
+# ---------------------------------------------------------------------------
+# Lazy Firebase initialisation.
+# Reading the service-account key and creating the Firestore client happen on
+# first use instead of at import time, so Flask reloader restarts and worker
+# start-up stay fast.  Double-checked locking makes sure only one thread does
+# the initialisation.
+#
+# One client, reused for all collections and all threads: a Firestore client
+# keeps its own gRPC connection pool, so never create a Client per request.
+# Always go through `db` / get_db().
+# ---------------------------------------------------------------------------
+_init_lock = Lock()
+_db = None
+
+
+def get_app():
+    """Return the default firebase_admin app, initialising it on first use."""
+    if not firebase_admin._apps:
+        with _init_lock:
+            # Avoid "already initialized" errors when Flask auto-reloads
+            if not firebase_admin._apps:
+                if not Path(FIREBASE_KEY_PATH).exists():
+                    raise FileNotFoundError(f"Firestore key not found at: {FIREBASE_KEY_PATH}")
+                firebase_admin.initialize_app(credentials.Certificate(FIREBASE_KEY_PATH))
+    return firebase_admin.get_app()
+
+
+def get_db():
+    """Return the shared Firestore client, creating it on first use."""
+    global _db
+    if _db is None:
+        app = get_app()
+        with _init_lock:
+            if _db is None:
+                _db = firestore.client(app)
+    return _db
+
+
+class _LazyFirestoreClient:
+    """Stand-in for the Firestore client that builds it on first attribute access.
+
+    Keeps `from firebase import db` working everywhere without paying the
+    initialisation cost at import.
+    """
 
-cred = credentials.Certificate(FIREBASE_KEY_PATH)
+    def __getattr__(self, name):
+        # Only called for names not yet on the proxy.  The client is created
+        # once and never replaced, so its bound methods (`collection`, `batch`,
+        # ...) are pinned and later lookups are plain attribute hits.  Other
+        # attributes (properties, internal API handles) can change, so they
+        # are always read from the client.
+        value = getattr(get_db(), name)
+        if inspect.ismethod(value):
+            setattr(self, name, value)
+        return value
 
-# Avoid "already initialized" errors when Flask auto-reloads
-if not firebase_admin._apps:
-    firebase_admin.initialize_app(cred)
 
-db = firestore.client()
+db = _LazyFirestoreClient()
@@ -0,0 +1,25 @@
+"""Gunicorn settings for running SmartPost in production.
+
+Run from src/ with:  gunicorn app:app
+(gunicorn picks this file up automatically from the working directory.)
+"""
+
+import os
+
+bind = os.getenv("SMARTPOST_BIND", "0.0.0.0:5000")
+
+# One process: device state, queued commands and the in-memory caches live in
+# module globals, so several workers would each see a different copy.
+# Concurrency comes from threads instead; request handlers spend most of their
+# time waiting on Firestore, and all threads share one Firestore client.
+workers = 1
+worker_class = "gthread"
+threads = int(os.getenv("SMARTPOST_THREADS", "8"))
+
+# Keep browser/device connections open between polls so each request does not
+# pay a new TCP (and, behind the tunnel, TLS) handshake.
+keepalive = 30
+
+# Camera uploads can be slow on the Pi's network.
+timeout = 60
+graceful_timeout = 30
@@ -1,8 +1,35 @@
+import time
 from datetime import datetime, timezone
+from functools import lru_cache
+
+# (epoch milliseconds, formatted string) of the last _utc_now_iso() result.
+# Swapped as one tuple so concurrent readers never see a mismatched pair.
+_last_utc_iso: tuple = (0, "")
 
 
 def _utc_now_iso() -> str:
-    return datetime.now(timezone.utc).isoformat()
+    """Current UTC time as an ISO 8601 string (``...+00:00``).
+
+    Formats straight from time.time_ns() instead of building a tz-aware
+    datetime, and reuses the last string for calls in the same millisecond,
+    which is common when a burst of telemetry/commands arrives together.
+    """
+    global _last_utc_iso
+    now_ns = time.time_ns()
+    now_ms = now_ns // 1_000_000
+
+    cached_ms, cached_iso = _last_utc_iso
+    if now_ms == cached_ms:
+        return cached_iso
+
+    secs, rem_ns = divmod(now_ns, 1_000_000_000)
+    tm = time.gmtime(secs)
+    iso = "%04d-%02d-%02dT%02d:%02d:%02d.%06d+00:00" % (
+        tm.tm_year, tm.tm_mon, tm.tm_mday,
+        tm.tm_hour, tm.tm_min, tm.tm_sec, rem_ns // 1000,
+    )
+    _last_utc_iso = (now_ms, iso)
+    return iso
 
 
 def _utc_now_dt() -> datetime:
@@ -16,19 +43,113 @@ def _normalize_fs_dt(dt: datetime) -> datetime:
     return dt
 
 
+# Exact types that are already JSON-safe and can be copied as-is.
+_JSON_LEAF_TYPES = frozenset({str, int, float, bool, type(None)})
+
+
 def _serialize_firestore_value(value):
-    """Convert Firestore/python values into JSON-safe forms for API responses."""
-    if isinstance(value, datetime):
-        return value.isoformat()
-    if isinstance(value, dict):
-        return {k: _serialize_firestore_value(v) for k, v in value.items()}
-    if isinstance(value, list):
-        return [_serialize_firestore_value(v) for v in value]
-    return value
+    """Convert Firestore/python values into JSON-safe forms for API responses.
+
+    Datetimes become ISO 8601 strings in UTC; naive values are treated as UTC.
+
+    Walks nested dicts/lists with an explicit stack rather than recursing
+    per node.  Plain scalars are copied inline without being pushed; only
+    containers and non-trivial leaves (datetimes, etc.) go on the stack.
+    """
+    holder = [None]
+    stack = [(holder, 0, value)]
+
+    while stack:
+        parent, key, item = stack.pop()
+        item_type = type(item)
+
+        if item_type is dict or (item_type is not list and isinstance(item, dict)):
+            out = dict.fromkeys(item)  # keeps the source key order
+            for k, child in item.items():
+                if type(child) in _JSON_LEAF_TYPES:
+                    out[k] = child
+                else:
+                    stack.append((out, k, child))
+        elif item_type is list or isinstance(item, list):
+            out = list(item)
+            for i, child in enumerate(item):
+                if type(child) not in _JSON_LEAF_TYPES:
+                    stack.append((out, i, child))
+        elif isinstance(item, datetime):
+            # Always emit UTC ('+00:00'), whatever zone the value came in.
+            out = _normalize_fs_dt(item).astimezone(timezone.utc).isoformat()
+        else:
+            out = item
+
+        parent[key] = out
+
+    return holder[0]
 
 
 def _serialize_doc(doc) -> dict:
     data = doc.to_dict() or {}
-    data = _serialize_firestore_value(data)
+    # to_dict() hands back a fresh dict, so when every value is already a
+    # plain scalar it can be returned as-is instead of walked and copied.
+    if not all(type(v) in _JSON_LEAF_TYPES for v in data.values()):
+        data = _serialize_firestore_value(data)
     data["id"] = doc.id
     return data
+
+
+@lru_cache(maxsize=4096)
+def user_inbox_ref(db_client, username: str):
+    """users/{username}/notifications, built once per (client, user).
+
+    CollectionReferences are immutable handles, so the chain of collection()/
+    document() calls only needs to run the first time a user is seen.
+    """
+    return db_client.collection("users").document(username).collection("notifications")
+
+
+# Firestore caps a WriteBatch at 500 writes; stay below it with some headroom.
+FIRESTORE_BATCH_LIMIT = 450
+
+
+class BatchWriter:
+    """Collects writes into Firestore WriteBatches of at most `limit` ops.
+
+    Use set/update/delete like on a WriteBatch and call commit() once at the
+    end; full batches are committed automatically along the way.  commit()
+    returns the total number of writes committed.  If a commit fails the
+    exception propagates and that batch's writes are discarded, so a retry
+    never re-sends them.
+    """
+
+    def __init__(self, db_client, limit: int = FIRESTORE_BATCH_LIMIT):
+        self._db = db_client
+        self._limit = limit
+        self._batch = None
+        self._pending = 0
+        self.committed = 0
+
+    def _add(self, method: str, *args, **kwargs) -> None:
+        if self._batch is None:
+            self._batch = self._db.batch()
+        getattr(self._batch, method)(*args, **kwargs)
+        self._pending += 1
+        if self._pending >= self._limit:
+            self.commit()
+
+    def set(self, doc_ref, data: dict, merge: bool = False) -> None:
+        self._add("set", doc_ref, data, merge=merge)
+
+    def update(self, doc_ref, data: dict) -> None:
+        self._add("update", doc_ref, data)
+
+    def delete(self, doc_ref) -> None:
+        self._add("delete", doc_ref)
+
+    def commit(self) -> int:
+        try:
+            if self._pending:
+                self._batch.commit()
+                self.committed += self._pending
+        finally:
+            self._batch = None
+            self._pending = 0
+        return self.committed
@@ -0,0 +1,73 @@
+"""Queue-backed logging so request threads never block on stdout/stderr.
+
+Request handlers log through a QueueHandler, which formats the record and
+appends it to an in-memory queue.  One QueueListener thread per stream owns
+the StreamHandler and does the write and flush off the request path.
+"""
+
+import atexit
+import logging
+import queue
+import sys
+from typing import Optional
+from logging.handlers import QueueHandler, QueueListener
+
+from flask.logging import default_handler
+
+
+def _start_listener(stream) -> queue.SimpleQueue:
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    # Records arrive already formatted by the QueueHandler.
+    handler = logging.StreamHandler(stream)
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    listener = QueueListener(log_queue, handler, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+    return log_queue
+
+
+_stdout_queue = _start_listener(sys.stdout)
+_stderr_queue = _start_listener(sys.stderr)
+
+
+def route_to_queue(
+    logger: logging.Logger,
+    *,
+    formatter: Optional[logging.Formatter] = None,
+    stderr: bool = False,
+    propagate: bool = False,
+) -> logging.Logger:
+    """Replace `logger`'s handlers with one feeding a background listener.
+
+    `formatter` is applied before the record is queued (default: message
+    only); `stderr` picks the stream the listener writes to.
+    """
+    if not any(isinstance(h, QueueHandler) for h in logger.handlers):
+        for handler in list(logger.handlers):
+            logger.removeHandler(handler)
+        queue_handler = QueueHandler(_stderr_queue if stderr else _stdout_queue)
+        if formatter is not None:
+            queue_handler.setFormatter(formatter)
+        logger.addHandler(queue_handler)
+        logger.propagate = propagate
+    return logger
+
+
+def route_flask_logger(app) -> None:
+    """Move `app.logger` from Flask's default_handler onto the stderr queue.
+
+    Keeps Flask's log format and, like default_handler, does not propagate to
+    root, so records are not printed twice under gunicorn.  Does nothing when
+    Flask did not install default_handler (root already had a handler) or
+    something else has configured the logger.
+    """
+    if default_handler in app.logger.handlers:
+        route_to_queue(app.logger, formatter=default_handler.formatter, stderr=True)
+
+
+def get_queue_logger(name: str) -> logging.Logger:
+    """Return logger `name` wired to the background stdout listener."""
+    logger = logging.getLogger(name)
+    if not logger.handlers:
+        logger.setLevel(logging.INFO)
+    return route_to_queue(logger)
@@ -1,14 +1,24 @@
+import queue
+import threading
+import time
 import uuid
+from concurrent.futures import ThreadPoolExecutor
 from typing import Any, Dict, List, Optional
 
 from firebase_admin import firestore
 
 from config import NOTIFICATION_SCHEMA_VERSION
 from firebase import db
-from utils.firestore import _utc_now_iso
+from utils.firestore import (
+    _utc_now_iso, BatchWriter, FIRESTORE_BATCH_LIMIT, user_inbox_ref,
+)
+from utils.log_queue import get_queue_logger
 from utils.notification_cache import invalidate_notification_cache
 
 
+log = get_queue_logger("smartpost.notifications")
+
+
 # ---------------------------
 # Channel interfaces
 # ---------------------------
@@ -19,10 +29,16 @@ class NotificationChannel:
     Teammates can add WebPushChannel / MobilePushChannel later and register them.
     """
     name = "base"
+    # Channels that only write Firestore documents can stage those writes on a
+    # shared BatchWriter (see NotificationService.publish_batch).
+    batchable = False
 
     def deliver(self, payload: dict, recipients: List[str]) -> dict:
         raise NotImplementedError
 
+    def stage(self, writer: BatchWriter, payload: dict, recipients: List[str]) -> dict:
+        raise NotImplementedError
+
 
 class FirestoreEventLogChannel(NotificationChannel):
     """
@@ -31,19 +47,29 @@ class FirestoreEventLogChannel(NotificationChannel):
     Useful for debugging, auditing, and demoing.
     """
     name = "firestore_event_log"
+    batchable = True
 
     def __init__(self, db_client):
         self.db = db_client
 
-    def deliver(self, payload: dict, recipients: List[str]) -> dict:
+    def _event_ref_and_doc(self, payload: dict, recipients: List[str]):
         event_id = payload["event_id"]
         event_doc = {
             **payload,
             "recipient_usernames": recipients,
             "logged_at": firestore.SERVER_TIMESTAMP,
         }
-        self.db.collection("notification_events").document(event_id).set(event_doc)
-        return {"channel": self.name, "status": "ok", "logged_event_id": event_id}
+        return self.db.collection("notification_events").document(event_id), event_doc
+
+    def deliver(self, payload: dict, recipients: List[str]) -> dict:
+        event_ref, event_doc = self._event_ref_and_doc(payload, recipients)
+        event_ref.set(event_doc)
+        return {"channel": self.name, "status": "ok", "logged_event_id": payload["event_id"]}
+
+    def stage(self, writer: BatchWriter, payload: dict, recipients: List[str]) -> dict:
+        event_ref, event_doc = self._event_ref_and_doc(payload, recipients)
+        writer.set(event_ref, event_doc)
+        return {"channel": self.name, "status": "staged", "logged_event_id": payload["event_id"]}
 
 
 class FirestoreUserInboxChannel(NotificationChannel):
@@ -53,23 +79,30 @@ class FirestoreUserInboxChannel(NotificationChannel):
     This is the actual in-app notification store.
     """
     name = "firestore_user_inbox"
+    batchable = True
 
     def __init__(self, db_client):
         self.db = db_client
 
     def deliver(self, payload: dict, recipients: List[str]) -> dict:
-        event_id = payload["event_id"]
-        writes = 0
+        # One batched commit for all recipients instead of one RPC each.
+        writer = BatchWriter(self.db)
+        self.stage(writer, payload, recipients)
+        writes = writer.commit()
 
+        # Invalidate the in-memory cache so the next poll reflects this new
+        # notification without waiting for the TTL to expire.
         for username in recipients:
-            doc_ref = (
-                self.db.collection("users")
-                .document(username)
-                .collection("notifications")
-                .document(event_id)
-            )
+            invalidate_notification_cache(username)
+
+        return {"channel": self.name, "status": "ok", "writes": writes}
+
+    def stage(self, writer: BatchWriter, payload: dict, recipients: List[str]) -> dict:
+        event_id = payload["event_id"]
+        for username in recipients:
+            doc_ref = user_inbox_ref(self.db, username).document(event_id)
 
-            doc_ref.set({
+            writer.set(doc_ref, {
                 **payload,
                 "username": username,  # recipient
                 "read": False,
@@ -84,12 +117,7 @@ class FirestoreUserInboxChannel(NotificationChannel):
                 },
             }, merge=True)
 
-            writes += 1
-            # Invalidate the in-memory cache so the next poll reflects this new
-            # notification without waiting for the TTL to expire.
-            invalidate_notification_cache(username)
-
-        return {"channel": self.name, "status": "ok", "writes": writes}
+        return {"channel": self.name, "status": "staged", "writes": len(recipients)}
 
 
 class StubWebPushChannel(NotificationChannel):
@@ -126,6 +154,46 @@ class StubMobilePushChannel(NotificationChannel):
 # Notification service
 # ---------------------------
 
+def _skipped_no_recipients() -> dict:
+    return {
+        "status": "skipped",
+        "reason": "no_recipients",
+        "deliveries": [],
+    }
+
+
+def _build_payload(
+    *,
+    notif_type: str,
+    title: str,
+    body: str,
+    severity: str = "info",
+    actor_username: Optional[str] = None,
+    device_id: Optional[str] = None,
+    data: Optional[Dict[str, Any]] = None,
+) -> dict:
+    return {
+        "schema_version": NOTIFICATION_SCHEMA_VERSION,
+        "event_id": str(uuid.uuid4()),
+        "type": notif_type,
+        "title": title,
+        "body": body,
+        "severity": severity,  # info | warning | error | success
+        "actor_username": actor_username,
+        "device_id": device_id,
+        "data": data or {},
+        # client-visible creation time (immediate); Firestore server timestamp is written by channel
+        "created_at_client_iso": _utc_now_iso(),
+    }
+
+
+# Shared pool for fanning one publish() out to its channels concurrently, so
+# publish latency is roughly the slowest channel instead of the sum of all.
+# The Firestore client is shared across these threads (it keeps its own gRPC
+# connection pool).
+_PUBLISH_POOL = ThreadPoolExecutor(max_workers=8, thread_name_prefix="notif-publish")
+
+
 class NotificationService:
     """
     Notification orchestration layer.
@@ -149,33 +217,29 @@ class NotificationService:
     ) -> dict:
         recipients = [r for r in recipients if r]
         if not recipients:
-            return {
-                "status": "skipped",
-                "reason": "no_recipients",
-                "deliveries": [],
-            }
-
-        event_id = str(uuid.uuid4())
+            return _skipped_no_recipients()
+
+        payload = _build_payload(
+            notif_type=notif_type,
+            title=title,
+            body=body,
+            severity=severity,
+            actor_username=actor_username,
+            device_id=device_id,
+            data=data,
+        )
+        event_id = payload["event_id"]
 
-        payload = {
-            "schema_version": NOTIFICATION_SCHEMA_VERSION,
-            "event_id": event_id,
-            "type": notif_type,
-            "title": title,
-            "body": body,
-            "severity": severity,  # info | warning | error | success
-            "actor_username": actor_username,
-            "device_id": device_id,
-            "data": data or {},
-            # client-visible creation time (immediate); Firestore server timestamp is written by channel
-            "created_at_client_iso": _utc_now_iso(),
-        }
+        futures = [
+            (channel, _PUBLISH_POOL.submit(channel.deliver, payload, recipients))
+            for channel in self.channels
+        ]
 
+        # Collect in channel order so the deliveries list stays stable.
         deliveries = []
-        for channel in self.channels:
+        for channel, future in futures:
             try:
-                result = channel.deliver(payload, recipients)
-                deliveries.append(result)
+                deliveries.append(future.result())
             except Exception as e:
                 deliveries.append({
                     "channel": getattr(channel, "name", "unknown"),
@@ -190,6 +254,71 @@ class NotificationService:
             "deliveries": deliveries,
         }
 
+    def publish_batch(self, notifications: List[Dict[str, Any]]) -> List[dict]:
+        """
+        Publish several notifications at once. Each item takes the same keyword
+        arguments as publish(). Firestore writes from every batchable channel
+        are combined into shared batch commits (chunked at the batch limit)
+        instead of one commit per notification per channel.
+
+        A failed commit raises, and no other channel is delivered. Other
+        channels (push etc.) only run once the events are stored.
+        """
+        writer = BatchWriter(self.db)
+        results = []
+        staged = []  # (payload, recipients, deliveries) per published item
+        touched_users = set()
+
+        try:
+            for item in notifications:
+                recipients = [r for r in item.get("recipients", []) if r]
+                if not recipients:
+                    results.append(_skipped_no_recipients())
+                    continue
+
+                payload = _build_payload(**{k: v for k, v in item.items() if k != "recipients"})
+
+                # Slots stay None for non-batchable channels until after the commit,
+                # so the deliveries list keeps channel order.
+                deliveries = [
+                    channel.stage(writer, payload, recipients)
+                    if getattr(channel, "batchable", False) else None
+                    for channel in self.channels
+                ]
+
+                staged.append((payload, recipients, deliveries))
+                touched_users.update(recipients)
+                results.append({
+                    "status": "ok",
+                    "event_id": payload["event_id"],
+                    "recipient_count": len(recipients),
+                    "deliveries": deliveries,
+                })
+
+            writer.commit()
+        finally:
+            # Staged inbox writes only become visible after a commit, so the
+            # caches are invalidated here rather than by the channel.  Done
+            # even when a later chunk fails, since earlier chunks may already
+            # have been committed by the writer.
+            for username in touched_users:
+                invalidate_notification_cache(username)
+
+        for payload, recipients, deliveries in staged:
+            for i, channel in enumerate(self.channels):
+                if deliveries[i] is not None:
+                    continue
+                try:
+                    deliveries[i] = channel.deliver(payload, recipients)
+                except Exception as e:
+                    deliveries[i] = {
+                        "channel": getattr(channel, "name", "unknown"),
+                        "status": "error",
+                        "error": str(e),
+                    }
+
+        return results
+
 
 # ---------------------------
 # Recipient resolver + convenience publisher
@@ -212,18 +341,10 @@ def resolve_notification_recipients_for_device(
     - team roles
     - user preferences / muting
     """
-    recipients = []
-    if actor_username:
-        recipients.append(actor_username)
+    recipients = [actor_username]
 
-    # Deduplicate while preserving order
-    deduped = []
-    seen = set()
-    for r in recipients:
-        if r not in seen:
-            seen.add(r)
-            deduped.append(r)
-    return deduped
+    # Deduplicate while preserving order, dropping empty usernames
+    return list(dict.fromkeys(r for r in recipients if r))
 
 
 # ---------------------------
@@ -265,3 +386,100 @@ def publish_device_notification(
         device_id=device_id,
         data=data,
     )
+
+
+def publish_device_notifications(notifications: List[Dict[str, Any]]) -> List[dict]:
+    """
+    Batch form of publish_device_notification(): each item takes the same
+    keyword arguments, and all Firestore writes share batch commits.
+    """
+    return notification_service.publish_batch([
+        {
+            **item,
+            "recipients": resolve_notification_recipients_for_device(
+                device_id=item.get("device_id"),
+                actor_username=item.get("actor_username"),
+            ),
+        }
+        for item in notifications
+    ])
+
+
+# ---------------------------
+# Background delivery queue
+# ---------------------------
+
+# Request handlers enqueue notifications here and return immediately; a single
+# daemon worker does the Firestore writes. Notifications are best-effort, so
+# anything still queued when the process exits is dropped.
+_NOTIF_QUEUE: "queue.Queue[dict]" = queue.Queue()
+# The worker coalesces bursts: after the first item it keeps draining for up to
+# this long (or this many items) and publishes them together, trading at most
+# ~50 ms of notification latency for far fewer Firestore commits.
+_NOTIF_BATCH_WINDOW_S = 0.05
+_NOTIF_BATCH_MAX = FIRESTORE_BATCH_LIMIT
+_notif_worker_thread: Optional[threading.Thread] = None
+_notif_worker_lock = threading.Lock()
+
+
+def _drain_notif_queue() -> List[dict]:
+    items = [_NOTIF_QUEUE.get()]
+    deadline = time.monotonic() + _NOTIF_BATCH_WINDOW_S
+    while len(items) < _NOTIF_BATCH_MAX:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        try:
+            items.append(_NOTIF_QUEUE.get(timeout=remaining))
+        except queue.Empty:
+            break
+    return items
+
+
+def _notif_worker() -> None:
+    while True:
+        items = _drain_notif_queue()
+        try:
+            publish_device_notifications(items)
+        except Exception:
+            log.exception("Queued notification publish failed (%d dropped)", len(items))
+        finally:
+            for _ in items:
+                _NOTIF_QUEUE.task_done()
+
+
+def _ensure_notif_worker() -> None:
+    global _notif_worker_thread
+    if _notif_worker_thread is not None and _notif_worker_thread.is_alive():
+        return
+    with _notif_worker_lock:
+        if _notif_worker_thread is None or not _notif_worker_thread.is_alive():
+            _notif_worker_thread = threading.Thread(
+                target=_notif_worker, name="notif-worker", daemon=True
+            )
+            _notif_worker_thread.start()
+
+
+def enqueue_device_notification(
+    *,
+    actor_username: str,
+    device_id: str,
+    notif_type: str,
+    title: str,
+    body: str,
+    severity: str = "info",
+    data: Optional[Dict[str, Any]] = None,
+) -> dict:
+    """Queue a device notification for the background worker, which publishes
+    queued items together via publish_device_notifications()."""
+    _ensure_notif_worker()
+    _NOTIF_QUEUE.put_nowait({
+        "actor_username": actor_username,
+        "device_id": device_id,
+        "notif_type": notif_type,
+        "title": title,
+        "body": body,
+        "severity": severity,
+        "data": data,
+    })
+    return {"status": "queued", "type": notif_type}
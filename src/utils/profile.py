@@ -1 +1,54 @@
 # Profile utility functions
+import time
+from threading import Lock
+from typing import Optional
+
+# ---------------------------------------------------------------------------
+# Profile document cache (per username)
+# GET /api/profile/<username> is a pure read of one Firestore document, so
+# repeat reads are served from memory.  Create/update/delete must call
+# invalidate_profile_cache() so the next read sees the change.
+# Only existing profiles are cached; a 404 always goes back to Firestore.
+#
+# Each username has a generation counter that invalidate_profile_cache()
+# bumps.  A reader takes the generation before reading Firestore and passes
+# it to set_profile_cache(), which drops the store if an update invalidated
+# the entry in between, so a pre-update snapshot is never cached.
+# ---------------------------------------------------------------------------
+
+_PROFILE_TTL = 30  # seconds
+
+_profile_cache: dict = {}  # username -> (profile: dict, expiry: float)
+_profile_generation: dict = {}  # username -> int, bumped on invalidation
+_profile_lock = Lock()
+
+
+def get_cached_profile(username: str):
+    """Return the cached profile response body (dict) or None if expired/missing."""
+    with _profile_lock:
+        entry = _profile_cache.get(username)
+        if entry is not None:
+            profile, expiry = entry
+            if time.monotonic() < expiry:
+                return profile
+    return None
+
+
+def profile_cache_generation(username: str) -> int:
+    """Generation to pass to set_profile_cache() for a read starting now."""
+    with _profile_lock:
+        return _profile_generation.get(username, 0)
+
+
+def set_profile_cache(username: str, profile: dict, generation: Optional[int] = None) -> None:
+    """Cache `profile`, unless it was invalidated since `generation` was taken."""
+    with _profile_lock:
+        if generation is not None and _profile_generation.get(username, 0) != generation:
+            return
+        _profile_cache[username] = (profile, time.monotonic() + _PROFILE_TTL)
+
+
+def invalidate_profile_cache(username: str) -> None:
+    with _profile_lock:
+        _profile_cache.pop(username, None)
+        _profile_generation[username] = _profile_generation.get(username, 0) + 1
@@ -0,0 +1,33 @@
+"""Cache for pages whose rendered HTML never changes between requests.
+
+The landing page and the GET views of /login and /signup render the same
+template with constant arguments on every hit.  Rendering once and serving
+the stored bytes skips the Jinja render entirely for anonymous traffic.
+"""
+
+from threading import Lock
+
+from flask import Response, current_app, render_template
+
+_page_cache: dict = {}  # (template_name, context_items) -> rendered bytes
+_page_lock = Lock()
+
+
+def render_static_page(template_name: str, **context) -> Response:
+    """Render `template_name` once per distinct context and reuse the bytes.
+
+    Only use this for templates that do not read the session, request or any
+    other per-user state.  In debug mode the cache is bypassed so template
+    edits still show up on reload.
+    """
+    key = (template_name, tuple(sorted(context.items())))
+    with _page_lock:
+        body = _page_cache.get(key)
+
+    if body is None:
+        body = render_template(template_name, **context).encode()
+        if not current_app.debug:
+            with _page_lock:
+                _page_cache[key] = body
+
+    return Response(body, mimetype="text/html")
@@ -1 +1,10 @@
 # Validation utility functions
+import re
+
+# Device ids are used as Firestore document ids, upload directory names and
+# inside JSON/HTML responses, so only a conservative charset is accepted.
+_DEVICE_ID_MATCH = re.compile(r"[A-Za-z0-9_-]{1,64}").fullmatch
+
+
+def is_valid_device_id(device_id) -> bool:
+    return isinstance(device_id, str) and _DEVICE_ID_MATCH(device_id) is not None
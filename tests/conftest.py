@@ -86,6 +86,8 @@ def mock_firestore():
 
     fake_firebase_module = types.ModuleType("firebase")
     fake_firebase_module.db = mock_db
+    fake_firebase_module.get_db = MagicMock(name="get_db", return_value=mock_db)
+    fake_firebase_module.get_app = MagicMock(name="get_app")
 
     return {
         "db": mock_db,
@@ -171,6 +173,8 @@ def clear_in_memory_caches():
     """Reset all in-process caches before every test so tests are isolated."""
     import utils.notification_cache as nc
     import utils.device_access as da
+    import utils.profile as up
+    import utils.firestore as fs
 
     with nc._notif_list_lock:
         nc._notif_list_cache.clear()
@@ -182,5 +186,9 @@ def clear_in_memory_caches():
         da._device_cache.clear()
     with da._user_devices_lock:
         da._user_devices_cache.clear()
+    with up._profile_lock:
+        up._profile_cache.clear()
+        up._profile_generation.clear()
+    fs.user_inbox_ref.cache_clear()
 
     yield
\ No newline at end of file
@@ -123,6 +123,25 @@ def test_login_get_returns_page(client):
     assert response.status_code == 200
 
 
+def test_login_get_page_is_rendered_once(client):
+    first = client.get("/login")
+
+    with patch("utils.templates.render_template") as mock_render:
+        second = client.get("/login")
+
+    assert second.status_code == 200
+    assert second.data == first.data
+    mock_render.assert_not_called()
+
+
+def test_pages_are_compressed_and_not_cached(client):
+    response = client.get("/", headers={"Accept-Encoding": "gzip"})
+
+    assert response.status_code == 200
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert response.headers["Cache-Control"] == "no-cache, no-store, must-revalidate"
+
+
 def test_login_form_missing_fields_shows_error(client):
     response = client.post("/login", data={"email": "", "password": ""})
     assert response.status_code == 200
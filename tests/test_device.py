@@ -111,6 +111,38 @@ def test_device_state_success(client):
     assert "door_state" in data
 
 
+def test_device_state_reflects_latest_telemetry(client):
+    """State served after telemetry carries the reported values."""
+    client.post(
+        f"/api/device/{DEVICE_ID}/telemetry",
+        json={"door_state": "open", "weight_g": 42.5},
+        headers=device_headers(),
+    )
+
+    set_logged_in(client)
+    with patch("blueprints.device.routes.user_can_access_device", return_value=True):
+        response = client.get(f"/api/device/{DEVICE_ID}/state")
+
+    assert response.status_code == 200
+    assert response.mimetype == "application/json"
+    data = response.get_json()
+    assert data["door_state"] == "open"
+    assert data["weight_g"] == 42.5
+    assert data["last_update_iso"] is not None
+    assert data["cameras"]["cam0"] == f"/media/device/{DEVICE_ID}/camera/0/latest.jpg"
+    assert response.headers["Cache-Control"] == "private, max-age=1"
+
+
+def test_device_state_invalid_device_id(client):
+    """A device_id outside the allowed charset is rejected before the view runs."""
+    set_logged_in(client)
+    with patch("blueprints.device.routes.user_can_access_device") as mock_access:
+        response = client.get("/api/device/bad%22id/state")
+    assert response.status_code == 400
+    assert response.get_json() == {"error": "Invalid device_id."}
+    mock_access.assert_not_called()
+
+
 def test_device_state_forbidden(client):
     """Authenticated user without device access gets 403."""
     set_logged_in(client)
@@ -143,29 +175,46 @@ def test_command_invalid_payload(client):
     assert response.status_code == 400
 
 
+def test_command_non_string_payload(client):
+    """Non-string command value returns 400 rather than erroring."""
+    set_logged_in(client)
+    with patch("blueprints.device.routes.user_can_access_device", return_value=True):
+        response = client.post(
+            f"/api/device/{DEVICE_ID}/command",
+            json={"command": ["open"]},
+        )
+    assert response.status_code == 400
+
+
 def test_command_open_success(client):
     """Valid 'open' command returns 200."""
     set_logged_in(client)
     with patch("blueprints.device.routes.user_can_access_device", return_value=True), \
-         patch("blueprints.device.routes.publish_device_notification", return_value=None):
+         patch("blueprints.device.routes.enqueue_device_notification",
+               return_value={"status": "queued"}) as enqueue:
         response = client.post(
             f"/api/device/{DEVICE_ID}/command",
             json={"command": "open"},
         )
     assert response.status_code == 200
     assert "open" in response.get_json()["message"]
+    assert response.get_json()["notification"] == {"status": "queued"}
+    enqueue.assert_called_once()
 
 
 def test_command_close_success(client):
     """Valid 'close' command returns 200."""
     set_logged_in(client)
     with patch("blueprints.device.routes.user_can_access_device", return_value=True), \
-         patch("blueprints.device.routes.publish_device_notification", return_value=None):
+         patch("blueprints.device.routes.enqueue_device_notification",
+               return_value={"status": "queued"}) as enqueue:
         response = client.post(
             f"/api/device/{DEVICE_ID}/command",
             json={"command": "close"},
         )
     assert response.status_code == 200
+    notif_types = [c.kwargs["notif_type"] for c in enqueue.call_args_list]
+    assert notif_types == ["device_command", "door_close_requested"]
 
 
 # ---------------------------------------------------------------------------
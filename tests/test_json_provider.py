@@ -0,0 +1,42 @@
+from datetime import datetime, timezone
+from decimal import Decimal
+
+from flask import jsonify, request
+from google.api_core.datetime_helpers import DatetimeWithNanoseconds
+
+
+def test_jsonify_sorts_keys_and_is_compact(client):
+    with client.application.test_request_context():
+        response = jsonify({"b": 1, "a": [1, 2]})
+
+    assert response.mimetype == "application/json"
+    assert response.data == b'{"a":[1,2],"b":1}\n'
+
+
+def test_dumps_handles_datetimes_and_fallback_types(client):
+    provider = client.application.json
+
+    aware = datetime(2026, 1, 2, 3, 4, 5, tzinfo=timezone.utc)
+    naive = datetime(2026, 1, 2, 3, 4, 5)
+
+    assert provider.dumps({"at": aware}) == '{"at":"2026-01-02T03:04:05+00:00"}'
+    assert provider.dumps({"at": naive}) == '{"at":"2026-01-02T03:04:05+00:00"}'
+    assert provider.dumps({"n": Decimal("1.5")}) == '{"n":"1.5"}'
+    assert provider.dumps({1: "x"}) == '{"1":"x"}'
+
+
+def test_dumps_formats_firestore_timestamps_like_datetimes(client):
+    provider = client.application.json
+
+    stamp = DatetimeWithNanoseconds(2026, 1, 2, 3, 4, 5, tzinfo=timezone.utc)
+    naive_stamp = DatetimeWithNanoseconds(2026, 1, 2, 3, 4, 5)
+
+    assert provider.dumps({"at": stamp}) == '{"at":"2026-01-02T03:04:05+00:00"}'
+    assert provider.dumps({"at": naive_stamp}) == '{"at":"2026-01-02T03:04:05+00:00"}'
+
+
+def test_get_json_parses_request_body_with_orjson(client):
+    with client.application.test_request_context(
+        "/", method="POST", data=b'{"command":"open"}', content_type="application/json"
+    ):
+        assert request.get_json() == {"command": "open"}
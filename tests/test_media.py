@@ -0,0 +1,134 @@
+"""
+Tests for camera snapshot upload and retrieval.
+
+Covers:
+- POST /api/device/<device_id>/camera/<camera_id>/snapshot (device API key auth)
+- GET /media/device/<device_id>/camera/<camera_id>/latest.jpg (session auth)
+"""
+import io
+import shutil
+from unittest.mock import patch
+
+import pytest
+
+
+DEVICE_ID = "test-device-001"
+API_KEY = "test-sensor-key"
+
+
+def set_logged_in(client):
+    with client.session_transaction() as sess:
+        sess["logged_in"] = True
+        sess["username"] = "test_user_123"
+
+
+def device_headers():
+    return {"X-API-Key": API_KEY}
+
+
+@pytest.fixture
+def upload_root(tmp_path, monkeypatch):
+    """Point the media blueprint at a throwaway uploads directory."""
+    monkeypatch.setattr("blueprints.media.routes.UPLOAD_ROOT", tmp_path)
+    monkeypatch.setattr("blueprints.media.routes.BASE_DIR", tmp_path)
+    return tmp_path
+
+
+def upload_snapshot(client, data=b"fake-jpeg-bytes", camera_id=0):
+    return client.post(
+        f"/api/device/{DEVICE_ID}/camera/{camera_id}/snapshot",
+        data={"image": (io.BytesIO(data), "snap.jpg")},
+        content_type="multipart/form-data",
+        headers=device_headers(),
+    )
+
+
+def test_snapshot_upload_writes_latest_file(client, upload_root):
+    response = upload_snapshot(client)
+
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body["size_bytes"] == len(b"fake-jpeg-bytes")
+
+    latest_dir = upload_root / f"device_{DEVICE_ID}" / "latest"
+    assert (latest_dir / "cam0.jpg").read_bytes() == b"fake-jpeg-bytes"
+    # No temp files are left behind after the rename.
+    assert [p.name for p in latest_dir.iterdir()] == ["cam0.jpg"]
+
+
+def test_snapshot_upload_replaces_previous_snapshot(client, upload_root):
+    upload_snapshot(client, data=b"first")
+    response = upload_snapshot(client, data=b"second")
+
+    assert response.status_code == 200
+    latest = upload_root / f"device_{DEVICE_ID}" / "latest" / "cam0.jpg"
+    assert latest.read_bytes() == b"second"
+
+
+def test_snapshot_upload_recreates_deleted_directory(client, upload_root):
+    upload_snapshot(client, data=b"first")
+    shutil.rmtree(upload_root / f"device_{DEVICE_ID}")
+
+    response = upload_snapshot(client, data=b"second")
+
+    assert response.status_code == 200
+    latest = upload_root / f"device_{DEVICE_ID}" / "latest" / "cam0.jpg"
+    assert latest.read_bytes() == b"second"
+
+
+def test_snapshot_upload_rejects_bad_extension(client, upload_root):
+    response = client.post(
+        f"/api/device/{DEVICE_ID}/camera/0/snapshot",
+        data={"image": (io.BytesIO(b"x"), "snap.exe")},
+        content_type="multipart/form-data",
+        headers=device_headers(),
+    )
+
+    assert response.status_code == 400
+
+
+def test_snapshot_upload_over_size_limit_returns_413(client, upload_root, monkeypatch):
+    monkeypatch.setitem(client.application.config, "MAX_CONTENT_LENGTH", 1024)
+
+    response = upload_snapshot(client, data=b"x" * 4096)
+
+    assert response.status_code == 413
+    assert not (upload_root / f"device_{DEVICE_ID}").exists()
+
+
+def test_latest_snapshot_not_found(client, upload_root):
+    set_logged_in(client)
+    with patch("blueprints.media.routes.user_can_access_device", return_value=True):
+        response = client.get(f"/media/device/{DEVICE_ID}/camera/0/latest.jpg")
+
+    assert response.status_code == 404
+
+
+def test_latest_snapshot_success(client, upload_root):
+    upload_snapshot(client, data=b"jpeg-data")
+
+    set_logged_in(client)
+    with patch("blueprints.media.routes.user_can_access_device", return_value=True):
+        response = client.get(f"/media/device/{DEVICE_ID}/camera/0/latest.jpg")
+
+    assert response.status_code == 200
+    assert response.data == b"jpeg-data"
+    assert response.mimetype == "image/jpeg"
+
+
+def test_latest_snapshot_supports_conditional_requests(client, upload_root):
+    upload_snapshot(client, data=b"jpeg-data")
+
+    set_logged_in(client)
+    with patch("blueprints.media.routes.user_can_access_device", return_value=True):
+        first = client.get(f"/media/device/{DEVICE_ID}/camera/0/latest.jpg")
+        second = client.get(
+            f"/media/device/{DEVICE_ID}/camera/0/latest.jpg",
+            headers={"If-None-Match": first.headers["ETag"]},
+        )
+
+    assert first.status_code == 200
+    assert "private" in first.headers["Cache-Control"]
+    assert "no-store" not in first.headers["Cache-Control"]
+    assert second.status_code == 304
+    assert second.data == b""
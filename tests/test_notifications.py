@@ -1,5 +1,8 @@
 from datetime import datetime, timedelta, timezone
-from unittest.mock import MagicMock, patch
+from unittest.mock import ANY, MagicMock, patch
+
+import pytest
+from google.api_core.exceptions import FailedPrecondition
 
 
 def set_logged_in(client, username="test_user_123"):
@@ -191,7 +194,7 @@ def test_notifications_mark_all_read_success(client):
             .document.return_value
             .collection.return_value
         )
-        filtered = notifications.where.return_value
+        filtered = notifications.where.return_value.select.return_value
         filtered.stream.return_value = docs
         mock_db.batch.return_value = batch
 
@@ -204,6 +207,7 @@ def test_notifications_mark_all_read_success(client):
     }
     assert batch.update.call_count == 2
     batch.commit.assert_called_once()
+    notifications.where.return_value.select.assert_called_once_with([])
 
 
 def test_notifications_mark_all_read_with_no_unread(client):
@@ -217,7 +221,7 @@ def test_notifications_mark_all_read_with_no_unread(client):
             .document.return_value
             .collection.return_value
         )
-        filtered = notifications.where.return_value
+        filtered = notifications.where.return_value.select.return_value
         filtered.stream.return_value = []
         mock_db.batch.return_value = batch
 
@@ -360,12 +364,10 @@ def test_door_close_chart_invalid_hours_returns_400(client):
     assert response.get_json() == {"error": "hours must be an integer"}
 
 
-def test_door_close_chart_success_counts_supported_events(client):
-    set_logged_in(client)
-
+def door_close_chart_docs():
+    """Mixed events around the 24h window; 3 of them count toward the chart."""
     now = datetime.now(timezone.utc)
-
-    docs = [
+    return [
         make_doc(
             doc_id="e1",
             data={
@@ -412,12 +414,19 @@ def test_door_close_chart_success_counts_supported_events(client):
         ),
     ]
 
+
+def test_door_close_chart_success_counts_supported_events(client):
+    set_logged_in(client)
+
+    docs = door_close_chart_docs()
+
     with patch(
         "blueprints.notifications.routes.user_can_access_device",
         return_value=True,
     ), patch("blueprints.notifications.routes.db") as mock_db:
-        # Two chained .where() calls are now used: .where(device_id).where(logged_at)
-        query = mock_db.collection.return_value.where.return_value.where.return_value
+        # Three chained .where() calls: device_id, type, logged_at
+        where = mock_db.collection.return_value.where
+        query = where.return_value.where.return_value.where.return_value
         query.stream.return_value = docs
 
         response = client.get("/api/device/device-001/door-close-chart?hours=24")
@@ -430,6 +439,43 @@ def test_door_close_chart_success_counts_supported_events(client):
     assert len(body["values"]) == 24
     assert sum(body["values"]) == 3
     assert body["total"] == 3
+    where.return_value.where.assert_called_once_with(
+        "type", "in", ["door_closed", "door_close_requested"]
+    )
+
+
+# ---------------------------------------------------------------------------
+# Cache-hit and cache-invalidation tests
+# ---------------------------------------------------------------------------
+
+
+def test_door_close_chart_falls_back_when_index_missing(client):
+    set_logged_in(client)
+
+    docs = door_close_chart_docs()
+
+    with patch(
+        "blueprints.notifications.routes.user_can_access_device",
+        return_value=True,
+    ), patch("blueprints.notifications.routes.db") as mock_db:
+        # Indexed query (device_id, type, logged_at) fails; the fallback
+        # (device_id, logged_at) query returns the events.
+        where = mock_db.collection.return_value.where
+        indexed = where.return_value.where.return_value.where.return_value
+        indexed.stream.side_effect = FailedPrecondition("The query requires an index.")
+        where.return_value.where.return_value.stream.return_value = docs
+
+        response = client.get("/api/device/device-001/door-close-chart?hours=24")
+
+    assert response.status_code == 200
+    body = response.get_json()
+
+    assert body["device_id"] == "device-001"
+    assert len(body["labels"]) == 24
+    assert len(body["values"]) == 24
+    assert sum(body["values"]) == 3
+    assert body["total"] == 3
+    where.return_value.where.assert_called_with("logged_at", ">=", ANY)
 
 
 # ---------------------------------------------------------------------------
@@ -532,7 +578,7 @@ def test_mark_all_read_invalidates_cache(client):
             .document.return_value
             .collection.return_value
         )
-        filtered = notifications.where.return_value
+        filtered = notifications.where.return_value.select.return_value
         filtered.stream.return_value = [make_doc(doc_id="a"), make_doc(doc_id="b")]
         mock_db.batch.return_value = MagicMock()
 
@@ -574,7 +620,7 @@ def test_door_close_chart_served_from_cache(client):
         "blueprints.notifications.routes.user_can_access_device",
         return_value=True,
     ), patch("blueprints.notifications.routes.db") as mock_db:
-        query = mock_db.collection.return_value.where.return_value.where.return_value
+        query = mock_db.collection.return_value.where.return_value.where.return_value.where.return_value
         query.stream.return_value = []
 
         r1 = client.get("/api/device/device-001/door-close-chart?hours=24")
@@ -584,4 +630,230 @@ def test_door_close_chart_served_from_cache(client):
         # Second request within TTL: served from cache
         r2 = client.get("/api/device/device-001/door-close-chart?hours=24")
         assert r2.status_code == 200
-        assert query.stream.call_count == 1  # no additional Firestore call
\ No newline at end of file
+        assert query.stream.call_count == 1  # no additional Firestore call
+
+# ---------------------------------------------------------------------------
+# NotificationService fan-out
+# ---------------------------------------------------------------------------
+
+class _RecordingChannel:
+    def __init__(self, name, error=None):
+        self.name = name
+        self.error = error
+        self.calls = []
+
+    def deliver(self, payload, recipients):
+        self.calls.append((payload["event_id"], list(recipients)))
+        if self.error:
+            raise self.error
+        return {"channel": self.name, "status": "ok"}
+
+
+def test_publish_delivers_to_all_channels_in_order():
+    from utils.notifications import NotificationService
+
+    channels = [_RecordingChannel("a"), _RecordingChannel("b"), _RecordingChannel("c")]
+    service = NotificationService(db_client=MagicMock(), channels=channels)
+
+    result = service.publish(
+        recipients=["alice", "", "bob"],
+        notif_type="device_command",
+        title="t",
+        body="b",
+    )
+
+    assert result["status"] == "ok"
+    assert result["recipient_count"] == 2
+    assert [d["channel"] for d in result["deliveries"]] == ["a", "b", "c"]
+    for channel in channels:
+        assert channel.calls == [(result["event_id"], ["alice", "bob"])]
+
+
+def test_publish_traps_channel_errors():
+    from utils.notifications import NotificationService
+
+    channels = [_RecordingChannel("ok"), _RecordingChannel("broken", error=RuntimeError("boom"))]
+    service = NotificationService(db_client=MagicMock(), channels=channels)
+
+    result = service.publish(recipients=["alice"], notif_type="x", title="t", body="b")
+
+    assert result["deliveries"] == [
+        {"channel": "ok", "status": "ok"},
+        {"channel": "broken", "status": "error", "error": "boom"},
+    ]
+
+
+def test_inbox_channel_writes_all_recipients_in_one_batch():
+    from utils.notifications import FirestoreUserInboxChannel
+
+    db = MagicMock()
+    batch = MagicMock()
+    db.batch.return_value = batch
+
+    result = FirestoreUserInboxChannel(db).deliver(
+        {"event_id": "evt-1", "title": "t"}, ["alice", "bob"]
+    )
+
+    assert result == {"channel": "firestore_user_inbox", "status": "ok", "writes": 2}
+    db.batch.assert_called_once()
+    assert batch.set.call_count == 2
+    batch.commit.assert_called_once()
+
+
+def test_batch_writer_splits_at_limit():
+    from utils.firestore import BatchWriter
+
+    db = MagicMock()
+    batches = [MagicMock(), MagicMock()]
+    db.batch.side_effect = batches
+
+    writer = BatchWriter(db, limit=3)
+    for i in range(5):
+        writer.delete(f"ref-{i}")
+
+    assert writer.commit() == 5
+    assert batches[0].delete.call_count == 3
+    assert batches[1].delete.call_count == 2
+    batches[0].commit.assert_called_once()
+    batches[1].commit.assert_called_once()
+
+
+def test_batch_writer_failed_commit_discards_batch():
+    from utils.firestore import BatchWriter
+
+    db = MagicMock()
+    failed, retry = MagicMock(), MagicMock()
+    failed.commit.side_effect = RuntimeError("unavailable")
+    db.batch.side_effect = [failed, retry]
+
+    writer = BatchWriter(db, limit=2)
+    writer.delete("ref-0")
+    with pytest.raises(RuntimeError):
+        writer.delete("ref-1")
+
+    writer.delete("ref-2")
+    assert writer.commit() == 1
+    assert retry.delete.call_args_list == [(("ref-2",),)]
+
+
+def test_enqueued_notification_is_published_by_worker():
+    import utils.notifications as notifications
+
+    with patch.object(notifications, "publish_device_notifications") as publish:
+        result = notifications.enqueue_device_notification(
+            actor_username="alice",
+            device_id="dev-1",
+            notif_type="device_command",
+            title="t",
+            body="b",
+        )
+        notifications._NOTIF_QUEUE.join()
+
+    assert result == {"status": "queued", "type": "device_command"}
+    publish.assert_called_once_with([{
+        "actor_username": "alice",
+        "device_id": "dev-1",
+        "notif_type": "device_command",
+        "title": "t",
+        "body": "b",
+        "severity": "info",
+        "data": None,
+    }])
+
+
+def test_publish_batch_combines_firestore_writes_into_one_commit():
+    from utils.notifications import (
+        NotificationService,
+        FirestoreEventLogChannel,
+        FirestoreUserInboxChannel,
+    )
+
+    db = MagicMock()
+    batch = MagicMock()
+    db.batch.return_value = batch
+    stub = _RecordingChannel("stub")
+    service = NotificationService(
+        db_client=db,
+        channels=[FirestoreEventLogChannel(db), FirestoreUserInboxChannel(db), stub],
+    )
+
+    with patch("utils.notifications.invalidate_notification_cache") as invalidate:
+        results = service.publish_batch([
+            {"recipients": ["alice", "bob"], "notif_type": "a", "title": "t", "body": "b"},
+            {"recipients": [], "notif_type": "b", "title": "t", "body": "b"},
+            {"recipients": ["alice"], "notif_type": "c", "title": "t", "body": "b"},
+        ])
+
+    assert [r["status"] for r in results] == ["ok", "skipped", "ok"]
+    # 2 event-log docs + 3 inbox docs, all in a single commit.
+    db.batch.assert_called_once()
+    assert batch.set.call_count == 5
+    batch.commit.assert_called_once()
+    assert len(stub.calls) == 2
+    assert sorted(c.args[0] for c in invalidate.call_args_list) == ["alice", "bob"]
+
+
+def test_publish_batch_commit_failure_propagates_before_push_channels():
+    from utils.notifications import NotificationService, FirestoreUserInboxChannel
+
+    db = MagicMock()
+    db.batch.return_value.commit.side_effect = RuntimeError("unavailable")
+    stub = _RecordingChannel("stub")
+    service = NotificationService(db_client=db, channels=[FirestoreUserInboxChannel(db), stub])
+
+    with patch("utils.notifications.invalidate_notification_cache") as invalidate, \
+         pytest.raises(RuntimeError):
+        service.publish_batch([
+            {"recipients": ["alice"], "notif_type": "a", "title": "t", "body": "b"},
+        ])
+
+    assert stub.calls == []
+    # Earlier chunks may have committed, so caches are still invalidated.
+    invalidate.assert_called_once_with("alice")
+
+
+def test_publish_batch_invalidates_committed_chunks_when_later_chunk_fails():
+    from functools import partial
+    from utils.firestore import BatchWriter
+    from utils.notifications import NotificationService, FirestoreUserInboxChannel
+
+    db = MagicMock()
+    committed, failed = MagicMock(), MagicMock()
+    failed.commit.side_effect = RuntimeError("unavailable")
+    db.batch.side_effect = [committed, failed]
+    service = NotificationService(db_client=db, channels=[FirestoreUserInboxChannel(db)])
+
+    with patch("utils.notifications.BatchWriter", partial(BatchWriter, limit=1)), \
+         patch("utils.notifications.invalidate_notification_cache") as invalidate, \
+         pytest.raises(RuntimeError):
+        service.publish_batch([
+            {"recipients": ["alice"], "notif_type": "a", "title": "t", "body": "b"},
+            {"recipients": ["bob"], "notif_type": "a", "title": "t", "body": "b"},
+        ])
+
+    committed.commit.assert_called_once()
+    invalidate.assert_called_once_with("alice")
+
+
+def test_publish_skipped_results_are_independent():
+    from utils.notifications import NotificationService
+
+    service = NotificationService(db_client=MagicMock(), channels=[])
+
+    first = service.publish(recipients=[], notif_type="x", title="t", body="b")
+    first["deliveries"].append("mutated")
+    second = service.publish(recipients=[], notif_type="x", title="t", body="b")
+
+    assert second["deliveries"] == []
+
+
+def test_resolve_recipients_returns_actor_only():
+    from utils.notifications import resolve_notification_recipients_for_device
+
+    assert resolve_notification_recipients_for_device(
+        device_id="dev-1", actor_username="alice"
+    ) == ["alice"]
+    assert resolve_notification_recipients_for_device(
+        device_id="dev-1", actor_username=None
+    ) == []
+
@@ -1,5 +1,7 @@
 from unittest.mock import MagicMock, patch
 
+from google.api_core.exceptions import NotFound
+
 
 def make_snapshot(*, exists=True, doc_id="alice", data=None):
     snap = MagicMock()
@@ -126,7 +128,7 @@ def test_update_profile_success(client):
     }
     mock_db.collection.assert_called_with("profiles")
     mock_collection.document.assert_called_with("alice")
-    mock_doc_ref.get.assert_called_once()
+    mock_doc_ref.get.assert_not_called()
     mock_doc_ref.update.assert_called_once_with(payload)
 
 
@@ -134,11 +136,10 @@ def test_update_profile_not_found_returns_404(client):
     with patch("blueprints.profile.routes.db") as mock_db:
         mock_collection = MagicMock()
         mock_doc_ref = MagicMock()
-        mock_snapshot = make_snapshot(exists=False, doc_id="missing-user", data={})
 
         mock_db.collection.return_value = mock_collection
         mock_collection.document.return_value = mock_doc_ref
-        mock_doc_ref.get.return_value = mock_snapshot
+        mock_doc_ref.update.side_effect = NotFound("No document to update")
 
         response = client.put(
             "/api/profile/missing-user",
@@ -147,7 +148,8 @@ def test_update_profile_not_found_returns_404(client):
 
     assert response.status_code == 404
     assert response.get_json() == {"error": "Not found"}
-    mock_doc_ref.update.assert_not_called()
+    mock_doc_ref.get.assert_not_called()
+    mock_doc_ref.update.assert_called_once_with({"first_name": "Nobody"})
 
 
 def test_update_profile_empty_json_returns_400(client):
@@ -200,22 +202,85 @@ def test_delete_profile_success(client):
     }
     mock_db.collection.assert_called_with("profiles")
     mock_collection.document.assert_called_with("alice")
-    mock_doc_ref.get.assert_called_once()
-    mock_doc_ref.delete.assert_called_once()
+    mock_doc_ref.get.assert_not_called()
+    mock_db.write_option.assert_called_once_with(exists=True)
+    mock_doc_ref.delete.assert_called_once_with(option=mock_db.write_option.return_value)
 
 
 def test_delete_profile_not_found_returns_404(client):
     with patch("blueprints.profile.routes.db") as mock_db:
         mock_collection = MagicMock()
         mock_doc_ref = MagicMock()
-        mock_snapshot = make_snapshot(exists=False, doc_id="missing-user", data={})
 
         mock_db.collection.return_value = mock_collection
         mock_collection.document.return_value = mock_doc_ref
-        mock_doc_ref.get.return_value = mock_snapshot
+        mock_doc_ref.delete.side_effect = NotFound("No document to delete")
 
         response = client.delete("/api/profile/missing-user")
 
     assert response.status_code == 404
     assert response.get_json() == {"error": "Not found"}
-    mock_doc_ref.delete.assert_not_called()
\ No newline at end of file
+    mock_doc_ref.get.assert_not_called()
+
+# ---------------------------------------------------------------------------
+# Cache and conditional-request tests
+# ---------------------------------------------------------------------------
+
+def test_get_profile_served_from_cache(client):
+    with patch("blueprints.profile.routes.db") as mock_db:
+        mock_doc_ref = mock_db.collection.return_value.document.return_value
+        mock_doc_ref.get.return_value = make_snapshot(exists=True, doc_id="alice")
+
+        r1 = client.get("/api/profile/alice")
+        r2 = client.get("/api/profile/alice")
+
+    assert r1.status_code == 200
+    assert r2.status_code == 200
+    assert r1.get_json() == r2.get_json()
+    mock_doc_ref.get.assert_called_once()
+
+
+def test_get_profile_returns_304_for_matching_etag(client):
+    with patch("blueprints.profile.routes.db") as mock_db:
+        mock_doc_ref = mock_db.collection.return_value.document.return_value
+        mock_doc_ref.get.return_value = make_snapshot(exists=True, doc_id="alice")
+
+        first = client.get("/api/profile/alice")
+        etag = first.headers["ETag"]
+
+        second = client.get("/api/profile/alice", headers={"If-None-Match": etag})
+
+    assert first.status_code == 200
+    assert etag
+    assert second.status_code == 304
+    assert second.data == b""
+
+
+def test_update_profile_invalidates_cache(client):
+    import utils.profile as up
+
+    up.set_profile_cache("alice", {"username": "alice", "first_name": "Old"})
+
+    with patch("blueprints.profile.routes.db"):
+        response = client.put("/api/profile/alice", json={"first_name": "New"})
+
+    assert response.status_code == 200
+    assert up.get_cached_profile("alice") is None
+
+
+def test_get_profile_does_not_cache_read_overlapping_an_update(client):
+    import utils.profile as up
+
+    def read_then_concurrent_update():
+        # Another request updates the profile after this read was taken.
+        up.invalidate_profile_cache("alice")
+        return make_snapshot(exists=True, doc_id="alice")
+
+    with patch("blueprints.profile.routes.db") as mock_db:
+        mock_doc_ref = mock_db.collection.return_value.document.return_value
+        mock_doc_ref.get.side_effect = read_then_concurrent_update
+
+        response = client.get("/api/profile/alice")
+
+    assert response.status_code == 200
+    assert up.get_cached_profile("alice") is None
@@ -0,0 +1,189 @@
+import importlib.util
+import logging
+from datetime import datetime, timedelta, timezone
+from logging.handlers import QueueHandler
+from pathlib import Path
+from unittest.mock import MagicMock
+
+from flask import Flask
+from flask.logging import default_handler
+
+import utils.firestore as fs
+from utils.log_queue import get_queue_logger, route_flask_logger, route_to_queue
+from utils.validation import is_valid_device_id
+
+
+def test_utc_now_iso_is_parseable_utc_timestamp():
+    value = fs._utc_now_iso()
+
+    parsed = datetime.fromisoformat(value)
+    assert value.endswith("+00:00")
+    assert parsed.tzinfo == timezone.utc
+    assert abs(datetime.now(timezone.utc) - parsed) < timedelta(seconds=5)
+
+
+def test_utc_now_iso_reuses_string_within_same_millisecond(monkeypatch):
+    monkeypatch.setattr(fs, "_last_utc_iso", (0, ""))
+    monkeypatch.setattr(fs.time, "time_ns", lambda: 1_767_225_600_123_456_789)
+
+    first = fs._utc_now_iso()
+    assert first == "2026-01-01T00:00:00.123456+00:00"
+    assert fs._utc_now_iso() is first
+
+
+def test_get_queue_logger_installs_one_queue_handler():
+    logger = get_queue_logger("smartpost.test")
+    assert get_queue_logger("smartpost.test") is logger
+
+    queue_handlers = [h for h in logger.handlers if isinstance(h, QueueHandler)]
+    assert len(queue_handlers) == 1
+    assert logger.propagate is False
+
+
+def test_route_to_queue_replaces_existing_handlers():
+    logger = logging.getLogger("smartpost.test.route")
+    logger.addHandler(logging.StreamHandler())
+
+    route_to_queue(logger)
+
+    assert len(logger.handlers) == 1
+    assert isinstance(logger.handlers[0], QueueHandler)
+
+
+def test_serialize_doc_flat_and_nested():
+    flat = {"title": "t", "read": False, "count": 3}
+    doc = MagicMock(id="doc-1")
+    doc.to_dict.return_value = flat
+    result = fs._serialize_doc(doc)
+    assert result is flat
+    assert result == {"title": "t", "read": False, "count": 3, "id": "doc-1"}
+
+    when = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    doc = MagicMock(id="doc-2")
+    doc.to_dict.return_value = {"created_at": when, "data": {"at": [when]}}
+    assert fs._serialize_doc(doc) == {
+        "created_at": "2026-01-01T00:00:00+00:00",
+        "data": {"at": ["2026-01-01T00:00:00+00:00"]},
+        "id": "doc-2",
+    }
+
+
+def test_serialize_firestore_value_normalizes_datetimes_to_utc():
+    plus_two = timezone(timedelta(hours=2))
+
+    assert fs._serialize_firestore_value({
+        "aware": datetime(2026, 1, 1, 2, 0, tzinfo=plus_two),
+        "naive": datetime(2026, 1, 1, 0, 0),
+    }) == {
+        "aware": "2026-01-01T00:00:00+00:00",
+        "naive": "2026-01-01T00:00:00+00:00",
+    }
+
+
+def test_user_inbox_ref_is_built_once_per_user():
+    db = MagicMock()
+    first = fs.user_inbox_ref(db, "alice")
+
+    assert fs.user_inbox_ref(db, "alice") is first
+    db.collection.assert_called_once_with("users")
+    db.collection.return_value.document.assert_called_once_with("alice")
+
+    fs.user_inbox_ref(db, "bob")
+    assert db.collection.call_count == 2
+
+
+def test_is_valid_device_id():
+    assert is_valid_device_id("smartpost-pi-1000")
+    assert is_valid_device_id("demo_123")
+    assert not is_valid_device_id("")
+    assert not is_valid_device_id("a" * 65)
+    assert not is_valid_device_id("../etc")
+    assert not is_valid_device_id('bad"id')
+    assert not is_valid_device_id(None)
+
+
+def test_serialize_firestore_value_converts_nested_datetimes():
+    at = datetime(2026, 1, 2, 3, 4, 5, tzinfo=timezone.utc)
+    value = {
+        "title": "t",
+        "count": 2,
+        "read": False,
+        "read_at": None,
+        "created_at": at,
+        "data": {"events": [at, {"at": at}, 1, "x"], "nested": {}},
+        "tags": [],
+    }
+
+    result = fs._serialize_firestore_value(value)
+
+    assert result == {
+        "title": "t",
+        "count": 2,
+        "read": False,
+        "read_at": None,
+        "created_at": at.isoformat(),
+        "data": {"events": [at.isoformat(), {"at": at.isoformat()}, 1, "x"], "nested": {}},
+        "tags": [],
+    }
+    assert list(result) == list(value)
+    # The input is not mutated.
+    assert value["created_at"] is at
+
+
+def test_serialize_firestore_value_scalars_pass_through():
+    at = datetime(2026, 1, 2, tzinfo=timezone.utc)
+
+    assert fs._serialize_firestore_value(at) == at.isoformat()
+    assert fs._serialize_firestore_value("x") == "x"
+    assert fs._serialize_firestore_value(None) is None
+
+
+def test_route_flask_logger_keeps_flask_format_without_propagating():
+    app = Flask("log_queue_test")
+    logger = app.logger
+    logger.handlers[:] = [default_handler]
+
+    route_flask_logger(app)
+
+    (handler,) = logger.handlers
+    assert isinstance(handler, QueueHandler)
+    assert logger.propagate is False
+    record = logger.makeRecord(logger.name, logging.ERROR, "routes.py", 1, "boom", None, None)
+    assert "ERROR in routes: boom" in handler.format(record)
+
+
+def test_route_flask_logger_leaves_configured_logger_alone():
+    app = Flask("log_queue_configured")
+    custom = logging.StreamHandler()
+    app.logger.handlers[:] = [custom]
+
+    route_flask_logger(app)
+
+    assert app.logger.handlers == [custom]
+    assert app.logger.propagate is True
+
+
+def test_lazy_firestore_client_pins_only_bound_methods(monkeypatch):
+    # conftest swaps in a fake `firebase` module; load the real one directly.
+    path = Path(__file__).resolve().parents[1] / "src" / "firebase.py"
+    spec = importlib.util.spec_from_file_location("firebase_under_test", path)
+    firebase_module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(firebase_module)
+
+    class FakeClient:
+        version = 1
+
+        def collection(self, name):
+            return name
+
+    monkeypatch.setattr(firebase_module, "get_db", lambda: client)
+    client = FakeClient()
+    proxy = firebase_module._LazyFirestoreClient()
+
+    assert proxy.collection("users") == "users"
+    assert proxy.version == 1
+    client.version = 2
+
+    assert "collection" in vars(proxy)
+    assert "version" not in vars(proxy)
+    assert proxy.version == 2